@@ -13,34 +13,145 @@ Examples:
     python LinkUpdater.py /path/to/files 10.100.100.114 172.25.220.114
     python LinkUpdater.py /path/to/files 192.168.1.1 192.168.1.100 --extensions .txt .md
     python LinkUpdater.py /path/to/files 10.0.0.1 10.0.0.50 --extensions .html .htm .php .js
+    python LinkUpdater.py /path/to/files 10.0.0.1 10.0.0.50 --map 10.0.0.2=10.0.0.51
 """
 
 import os
 import sys
 import argparse
+import mmap
+import queue
 import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 import logging
+import logging.handlers
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Log records are held in memory and written out in batches of this many
+LOG_BUFFER_SIZE = 1024
+
+# Directory listing gains little past a few threads, so the walk never uses more
+WALK_THREADS = 4
+
+# Keeps Windows from translating line endings on raw descriptors
+O_BINARY = getattr(os, 'O_BINARY', 0)
+
+# Basic IPv4 address format check
+IP_PATTERN = re.compile(r'(?:[0-9]{1,3}\.){3}[0-9]{1,3}')
+
+# Files smaller than this are read outright; mapping them costs more than it saves
+SMALL_FILE_SIZE = 4096
+
+# Rewritten files are streamed out in pieces of about this size
+CHUNK_SIZE = 1 << 20
+
+# Linux ioctl that shares a file's extents with another file on copy-on-write filesystems
+FICLONE = 0x40049409
+
+def reflink(src_fd, dst_fd):
+    """Clone a file without copying its data, returning False if the filesystem can't"""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False
+
+def device_queue(path):
+    """Return (nr_requests, rotational) for the block device holding path, or None if unknown"""
+    try:
+        dev = os.stat(path).st_dev
+        device_dir = f'/sys/dev/block/{os.major(dev)}:{os.minor(dev)}'
+        queue_dir = os.path.join(device_dir, 'queue')
+        if not os.path.isdir(queue_dir):
+            # Partitions share the queue of the disk they are on
+            queue_dir = os.path.join(device_dir, '..', 'queue')
+        with open(os.path.join(queue_dir, 'nr_requests')) as f:
+            nr_requests = int(f.read())
+        with open(os.path.join(queue_dir, 'rotational')) as f:
+            rotational = f.read().strip() == '1'
+        return nr_requests, rotational
+    except (OSError, ValueError, AttributeError):  # os.major is missing on Windows
+        return None
+
+def write_all(fd, data):
+    """Write all of data to fd, retrying short writes"""
+    with memoryview(data) as view:
+        while view:
+            view = view[os.write(fd, view):]
 
 class LinkUpdater:
-    def __init__(self, directory, old_ip, new_ip, extensions=None, backup=True, dry_run=False):
+    def __init__(self, directory, old_ip, new_ip, extensions=None, backup=True, dry_run=False, workers=None, ip_map=None):
         self.directory = Path(directory)
         self.old_ip = old_ip
         self.new_ip = new_ip
+        # Additional old -> new pairs, all replaced in the same pass over each file
+        self.ip_map = {old_ip: new_ip}
+        self.ip_map.update(ip_map or {})
+        self.ip_map_bytes = {old.encode(): new.encode() for old, new in self.ip_map.items()}
+        # Longest first, so an IP is never cut short by one of its prefixes
+        self.ip_pattern = re.compile(b'|'.join(
+            re.escape(old) for old in sorted(self.ip_map_bytes, key=len, reverse=True)))
+        if len(self.ip_map_bytes) == 1:
+            # A plain template lets re substitute without calling back into Python
+            self.ip_repl = next(iter(self.ip_map_bytes.values()))
+        else:
+            self.ip_repl = lambda m: self.ip_map_bytes[m.group()]
+        self.same_length = all(len(old) == len(new) for old, new in self.ip_map_bytes.items())
         self.extensions = extensions or ['.html', '.htm']
         self.backup = backup
         self.dry_run = dry_run
+        if workers == 'auto':
+            workers = self.auto_workers()
+        self.workers = workers if workers is not None else min(32, (os.cpu_count() or 1) * 4)
         self.files_processed = 0
         self.files_modified = 0
         self.replacements_made = 0
+        # (st_dev, st_ino) of every file taken up so far, so a file reachable through
+        # several paths (symlinks, hard links) is only ever updated once, by one worker
+        self._claimed = set()
+        self._claim_lock = threading.Lock()
         # Normalize extensions to ensure they start with a dot
         self.extensions = [ext if ext.startswith('.') else f'.{ext}' for ext in self.extensions]
         self.extensions = [ext.lower() for ext in self.extensions]
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
+        # Dotless form, matched against the tail of str.rpartition('.') on file names
+        self._ext_set = frozenset(ext[1:] for ext in self.extensions)
         self.logger = logging.getLogger(__name__)
+        # Report progress unless the application has asked for more detail
+        if self.logger.getEffectiveLevel() > logging.INFO:
+            self.logger.setLevel(logging.INFO)
+        # Unless logging is already set up, buffer output: per-file messages would
+        # otherwise cost a write to the terminal each. Errors still go out
+        # immediately, together with everything before them.
+        root = logging.getLogger()
+        if not root.handlers:
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(LOG_FORMAT))
+            root.addHandler(logging.handlers.MemoryHandler(
+                LOG_BUFFER_SIZE, flushLevel=logging.ERROR, target=console))
+    
+    def auto_workers(self):
+        """Size the worker pool to the queue of the device holding the directory
+        
+        Spinning disks thrash when too many requests compete for the head, while
+        SSDs and NVMe drives need many requests in flight to reach full speed.
+        """
+        queue = device_queue(self.directory)
+        if queue is None:
+            return None
+        nr_requests, rotational = queue
+        return max(1, min(nr_requests, 8 if rotational else 64))
     
     def validate_inputs(self):
         """Validate the input parameters"""
@@ -51,74 +162,285 @@ class LinkUpdater:
             raise ValueError(f"Path is not a directory: {self.directory}")
         
         # Basic IP address validation
-        ip_pattern = r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$'
-        if not re.match(ip_pattern, self.old_ip):
-            raise ValueError(f"Invalid old IP address format: {self.old_ip}")
-        
-        if not re.match(ip_pattern, self.new_ip):
-            raise ValueError(f"Invalid new IP address format: {self.new_ip}")
+        for old_ip, new_ip in self.ip_map.items():
+            if not IP_PATTERN.fullmatch(old_ip):
+                raise ValueError(f"Invalid old IP address format: {old_ip}")
+            
+            if not IP_PATTERN.fullmatch(new_ip):
+                raise ValueError(f"Invalid new IP address format: {new_ip}")
+            
+            if old_ip == new_ip:
+                raise ValueError(f"Old and new IP addresses are the same: {old_ip}")
         
-        if self.old_ip == self.new_ip:
-            raise ValueError("Old and new IP addresses are the same")
+        if self.workers < 1:
+            raise ValueError(f"Number of workers must be at least 1: {self.workers}")
+    
+    def scan_directory(self, path, subdirs):
+        """Return matching files directly inside path, appending its subdirectories to subdirs"""
+        files = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    # Like os.walk, do not descend into symlinked directories
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    else:
+                        # A leading dot marks a hidden file, not an extension
+                        stem, dot, ext = entry.name.rpartition('.')
+                        if stem and ext.lower() in self._ext_set and not entry.is_dir():
+                            files.append(entry.path)
+        except OSError as e:
+            self.logger.warning(f"Cannot read directory: {e}")
+        return files
     
     def find_target_files(self):
-        """Recursively find all files with specified extensions in the directory"""
-        target_files = []
-        for root, dirs, files in os.walk(self.directory):
-            for file in files:
-                file_ext = Path(file).suffix.lower()
-                if file_ext in self.extensions:
-                    target_files.append(Path(root) / file)
-        return target_files
-    
-    def backup_file(self, file_path):
-        """Create a backup of the file"""
-        backup_path = file_path.with_suffix(file_path.suffix + '.bak')
+        """Recursively yield paths of files with specified extensions in the directory
+        
+        Directories are scanned by a pool of up to WALK_THREADS threads of its own
+        (scandir releases the GIL), each handing over the matching files of a
+        directory as soon as it has read it.
+        """
+        pending = queue.Queue()
+        # Lists of matching files, one per directory; bounded so the walk can't run
+        # far ahead of processing. None marks the end of the walk.
+        found = queue.Queue(maxsize=self.workers * 4)
+        stop = threading.Event()
+        walkers = min(self.workers, WALK_THREADS)
+        
+        def hand_over(item):
+            while not stop.is_set():
+                try:
+                    found.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        
+        def walk():
+            while True:
+                path = pending.get()
+                try:
+                    if path is None:
+                        return
+                    if stop.is_set():
+                        continue
+                    subdirs = []
+                    files = self.scan_directory(path, subdirs)
+                    if stop.is_set():
+                        continue
+                    for subdir in subdirs:
+                        pending.put(subdir)
+                    if files:
+                        hand_over(files)
+                finally:
+                    pending.task_done()
+        
+        def finish():
+            # Once every queued directory is done nothing can add more, so the
+            # walkers can be told to exit without stranding any of them
+            pending.join()
+            for _ in range(walkers):
+                pending.put(None)
+            hand_over(None)
+        
+        pending.put(str(self.directory))
+        threads = [threading.Thread(target=walk, daemon=True) for _ in range(walkers)]
+        threads.append(threading.Thread(target=finish, daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                files = found.get()
+                if files is None:
+                    return
+                yield from files
+        finally:
+            # Also reached if the caller stops early: the walkers drain what is
+            # queued without adding to it, and finish() then lets them exit
+            stop.set()
+    
+    def backup_file(self, file_path, fd=None, data=None):
+        """Create a backup of the file
+        
+        An fd already open on the original and its data already in memory spare
+        reopening and rereading it.
+        """
+        backup_path = os.fspath(file_path) + '.bak'
         try:
-            backup_path.write_bytes(file_path.read_bytes())
+            src = fd if fd is not None else os.open(file_path, os.O_RDONLY | O_BINARY)
+            try:
+                dst = os.open(backup_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | O_BINARY, 0o666)
+                try:
+                    copied = reflink(src, dst)
+                    if not copied and data is not None:
+                        write_all(dst, data)
+                        copied = True
+                finally:
+                    os.close(dst)
+            finally:
+                if fd is None:
+                    os.close(src)
+            if not copied:
+                shutil.copyfile(file_path, backup_path)
             self.logger.debug(f"Created backup: {backup_path}")
         except Exception as e:
             self.logger.error(f"Failed to create backup for {file_path}: {e}")
             raise
     
-    def process_file(self, file_path):
-        """Process a single file"""
+    def iter_replaced(self, buf, hits):
+        """Yield the content of buf with every (offset, old IP) hit replaced, a bounded chunk at a time"""
+        chunk = bytearray()
+        last = 0
+        for pos, old in hits + [(len(buf), b'')]:
+            # Copy the unchanged bytes up to the hit, handing off the chunk whenever it fills up
+            while last < pos:
+                if len(chunk) >= CHUNK_SIZE:
+                    yield chunk
+                    chunk = bytearray()
+                end = min(pos, last + CHUNK_SIZE - len(chunk))
+                chunk += buf[last:end]
+                last = end
+            if old:
+                chunk += self.ip_map_bytes[old]
+                last += len(old)
+        if chunk:
+            yield chunk
+    
+    def write_file(self, file_path, chunks):
+        """Overwrite the file with chunks in place
+        
+        Writing through the file's own inode leaves symlinks, hard links, owner and
+        permissions exactly as they were.
+        """
+        fd = os.open(file_path, os.O_WRONLY | O_BINARY)
         try:
-            # Read the file
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            size = 0
+            for chunk in chunks:
+                write_all(fd, chunk)
+                size += len(chunk)
+            os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+    
+    def claim_file(self, st):
+        """Take up the file with stat result st, returning False if another path to it already did"""
+        key = (st.st_dev, st.st_ino)
+        with self._claim_lock:
+            if key in self._claimed:
+                return False
+            self._claimed.add(key)
+            return True
+    
+    def process_mapped_file(self, file_path, fd):
+        """Update a file too large to read outright through mmap, returning the number of replacements"""
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as buf:
+            # Most files never mention an old IP, so bail out on the first scan
+            first = self.ip_pattern.search(buf)
+            if first is None:
+                return 0
             
-            original_content = content
+            if self.dry_run:
+                # Only the count is needed, so keep nothing from the matches
+                return sum(1 for _ in self.ip_pattern.finditer(buf, first.start()))
             
-            # Replace all occurrences of the old IP with the new IP
-            content = content.replace(self.old_ip, self.new_ip)
+            # Locate every occurrence of any old IP, carrying on from the first
+            matches = self.ip_pattern.finditer(buf, first.start())
+            if isinstance(self.ip_repl, bytes) and self.same_length:
+                # With a single IP the offsets alone say what to write
+                hits = [m.start() for m in matches]
+            else:
+                hits = [(m.start(), m.group()) for m in matches]
+            
+            # Create backup if requested
+            if self.backup:
+                self.backup_file(file_path, fd=fd, data=buf)
             
-            # Count replacements made in this file
-            file_replacements = content.count(self.new_ip) - original_content.count(self.new_ip)
+            if self.same_length:
+                # Same length: overwrite the matches in place, through a writable
+                # mapping that is only asked for now that there is something to write
+                out_fd = os.open(file_path, os.O_RDWR | O_BINARY)
+                try:
+                    with mmap.mmap(out_fd, 0, access=mmap.ACCESS_WRITE) as out:
+                        if isinstance(self.ip_repl, bytes):
+                            new = self.ip_repl
+                            for pos in hits:
+                                out[pos:pos + len(new)] = new
+                        else:
+                            for pos, old in hits:
+                                out[pos:pos + len(old)] = self.ip_map_bytes[old]
+                        out.flush()
+                finally:
+                    os.close(out_fd)
+            else:
+                # Never hold a whole large file in memory: stream the new content through
+                # a scratch file, as writing it straight back would overwrite unread data.
+                # Keep it beside the file: the system temp dir may be a small tmpfs
+                scratch_dir = os.path.dirname(os.fspath(file_path)) or os.curdir
+                with tempfile.TemporaryFile(dir=scratch_dir) as scratch:
+                    for chunk in self.iter_replaced(buf, hits):
+                        scratch.write(chunk)
+                    # The mapping must go before the file under it is rewritten and truncated
+                    buf.close()
+                    scratch.seek(0)
+                    self.write_file(file_path, iter(lambda: scratch.read(CHUNK_SIZE), b''))
             
-            if content != original_content:
-                self.files_modified += 1
-                self.replacements_made += file_replacements
+            return len(hits)
+    
+    def process_file(self, file_path):
+        """Process a single file, returning (files processed, files modified, replacements made)"""
+        try:
+            content = None
+            # Work on a raw descriptor: a Python file object costs extra
+            # fstat/ioctl/lseek calls per file that we never need. Scanning only
+            # needs read access; files are reopened for writing once they match.
+            fd = os.open(file_path, os.O_RDONLY | O_BINARY)
+            try:
+                st = os.fstat(fd)
+                if not self.claim_file(st):
+                    self.logger.debug(f"Skipping {file_path}: already processed through another path")
+                    return 1, 0, 0
                 
-                if self.dry_run:
-                    self.logger.info(f"DRY RUN - Would modify {file_path} ({file_replacements} replacements)")
+                if st.st_size < SMALL_FILE_SIZE:
+                    # Small files are searched, counted and substituted in one pass inside re,
+                    # which beats patching each match from Python even for same-length IPs
+                    original = os.read(fd, st.st_size)
+                    content, file_replacements = self.ip_pattern.subn(self.ip_repl, original)
+                    if self.dry_run or not file_replacements:
+                        content = None
                 else:
+                    file_replacements = self.process_mapped_file(file_path, fd)
+                
+                if content is not None:
                     # Create backup if requested
                     if self.backup:
-                        self.backup_file(file_path)
-                    
-                    # Write the modified content back to the file
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    
+                        self.backup_file(file_path, fd=fd, data=original)
+                    self.write_file(file_path, [content])
+            finally:
+                os.close(fd)
+            
+            if file_replacements:
+                if self.dry_run:
+                    self.logger.info(f"DRY RUN - Would modify {file_path} ({file_replacements} replacements)")
+                else:
                     self.logger.info(f"Modified {file_path} ({file_replacements} replacements)")
             else:
                 self.logger.debug(f"No changes needed for {file_path}")
             
-            self.files_processed += 1
+            return 1, int(file_replacements > 0), file_replacements
             
         except Exception as e:
             self.logger.error(f"Error processing {file_path}: {e}")
+            return 0, 0, 0
+    
+    def add_results(self, futures):
+        """Add the counts returned by finished process_file calls to the totals
+        
+        Totals are summed here rather than shared between the workers.
+        """
+        for future in futures:
+            processed, modified, replaced = future.result()
+            self.files_processed += processed
+            self.files_modified += modified
+            self.replacements_made += replaced
     
     def run(self):
         """Main execution method"""
@@ -128,39 +450,62 @@ class LinkUpdater:
             self.logger.info(f"Starting LinkUpdater")
             self.logger.info(f"Directory: {self.directory}")
             self.logger.info(f"File extensions: {', '.join(self.extensions)}")
-            self.logger.info(f"Replacing: {self.old_ip} -> {self.new_ip}")
+            self.logger.info(f"Replacing: {', '.join(f'{old} -> {new}' for old, new in self.ip_map.items())}")
             self.logger.info(f"Backup enabled: {self.backup}")
             self.logger.info(f"Dry run: {self.dry_run}")
+            self.logger.info(f"Worker threads: {self.workers}")
             
-            # Find all target files
-            target_files = self.find_target_files()
+            # Process files in parallel as they are found
+            files_found = 0
+            self._claimed.clear()
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pending = set()
+                for file_path in self.find_target_files():
+                    files_found += 1
+                    pending.add(executor.submit(self.process_file, file_path))
+                    # Keep a bounded number of files in flight, collecting results as they finish
+                    if len(pending) >= self.workers * 4:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self.add_results(done)
+                self.add_results(wait(pending).done)
             
-            if not target_files:
+            if not files_found:
                 self.logger.warning(f"No files with extensions {', '.join(self.extensions)} found in the specified directory")
                 return
             
-            self.logger.info(f"Found {len(target_files)} files to process")
-            
-            # Process each file
-            for file_path in target_files:
-                self.process_file(file_path)
-            
             # Print summary
-            self.logger.info("=" * 50)
-            self.logger.info("SUMMARY")
-            self.logger.info("=" * 50)
-            self.logger.info(f"Files processed: {self.files_processed}")
-            self.logger.info(f"Files modified: {self.files_modified}")
-            self.logger.info(f"Total replacements: {self.replacements_made}")
+            summary = [
+                "=" * 50,
+                "SUMMARY",
+                "=" * 50,
+                f"Files found: {files_found}",
+                f"Files processed: {self.files_processed}",
+                f"Files modified: {self.files_modified}",
+                f"Total replacements: {self.replacements_made}",
+            ]
             
             if self.dry_run:
-                self.logger.info("This was a dry run - no files were actually modified")
+                summary.append("This was a dry run - no files were actually modified")
             elif self.backup and self.files_modified > 0:
-                self.logger.info("Backup files created with .bak extension")
+                summary.append("Backup files created with .bak extension")
+            
+            self.logger.info("\n".join(summary))
             
         except Exception as e:
             self.logger.error(f"Error: {e}")
             sys.exit(1)
+        finally:
+            for handler in logging.getLogger().handlers:
+                handler.flush()
+
+def worker_count(value):
+    """Parse a --workers value: a number of threads or 'auto'"""
+    if value == 'auto':
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'auto': {value}")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -172,6 +517,7 @@ Examples:
   %(prog)s /path/to/files 192.168.1.100 192.168.1.200 --extensions .txt .md
   %(prog)s /path/to/files 10.0.0.1 10.0.0.50 --extensions .html .htm .php .js
   %(prog)s . 192.168.1.1 192.168.1.100 --extensions txt --no-backup
+  %(prog)s /path/to/files 10.0.0.1 10.0.0.50 --map 10.0.0.2=10.0.0.51 10.0.0.3=10.0.0.52
         """
     )
     
@@ -186,9 +532,21 @@ Examples:
                        help='Show what would be changed without making modifications')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable verbose logging')
+    parser.add_argument('--workers', '--jobs', '-w', '-j', type=worker_count, default=None,
+                       help='Number of files to process in parallel, or "auto" to size it to the disk '
+                            '(up to 8 for spinning disks, 64 for SSDs) (default: 4 per CPU, up to 32)')
+    parser.add_argument('--map', '-m', nargs='+', default=[], metavar='OLD=NEW',
+                       help='Additional IP addresses to replace in the same pass, as OLD=NEW pairs')
     
     args = parser.parse_args()
     
+    ip_map = {}
+    for pair in args.map:
+        old_ip, sep, new_ip = pair.partition('=')
+        if not sep:
+            parser.error(f"--map entries must be OLD=NEW pairs: {pair}")
+        ip_map[old_ip] = new_ip
+    
     # Set logging level
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
@@ -200,7 +558,9 @@ Examples:
         new_ip=args.new_ip,
         extensions=args.extensions,
         backup=not args.no_backup,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        workers=args.workers,
+        ip_map=ip_map
     )
     
     updater.run()